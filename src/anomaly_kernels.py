@@ -0,0 +1,200 @@
+"""
+Numeric Kernels for Transaction Anomaly Detection
+Numba-compiled loops for the rate / z-score hot paths
+"""
+
+import numpy as np
+from numba import njit, prange
+
+# datetime64 NaT viewed as int64
+NAT_NS = np.iinfo(np.int64).min
+
+# ============================================================================
+# ROLLING STATISTICS
+# ============================================================================
+
+@njit(cache=True, parallel=True)
+def rolling_zscore(counts, totals, window, sigma=2.0):
+    """
+    Rolling z-score of a status rate against its trailing baseline
+
+    counts/totals are int64 arrays (status count and all-status total per
+    bucket). Each point is compared with the mean and sample std of the
+    non-empty buckets among the `window` before it, using prefix sums so the
+    whole pass is O(n). Empty buckets (total 0) have no rate: they are NaN in
+    the output, never flagged, and left out of the baseline.
+    Returns (rates in %, z-scores, anomaly flags as uint8) where a point is
+    flagged when rate > mean + sigma * std.
+    """
+    n = counts.shape[0]
+    rates = np.full(n, np.nan, dtype=np.float64)
+    z_scores = np.zeros(n, dtype=np.float64)
+    flags = np.zeros(n, dtype=np.uint8)
+
+    # Prefix sums of rate, rate^2 and non-empty bucket count (index i holds
+    # the sum over buckets[:i])
+    prefix = np.zeros(n + 1, dtype=np.float64)
+    prefix_sq = np.zeros(n + 1, dtype=np.float64)
+    prefix_n = np.zeros(n + 1, dtype=np.int64)
+    for i in range(n):
+        prefix[i + 1] = prefix[i]
+        prefix_sq[i + 1] = prefix_sq[i]
+        prefix_n[i + 1] = prefix_n[i]
+        if totals[i] > 0:
+            rates[i] = 100.0 * counts[i] / totals[i]
+            prefix[i + 1] += rates[i]
+            prefix_sq[i + 1] += rates[i] * rates[i]
+            prefix_n[i + 1] += 1
+
+    for i in prange(n):
+        if totals[i] == 0:
+            continue
+        start = max(0, i - window)
+        m = prefix_n[i] - prefix_n[start]
+        if m < 2:
+            continue
+        s = prefix[i] - prefix[start]
+        s2 = prefix_sq[i] - prefix_sq[start]
+        mean = s / m
+        var = (s2 - s * mean) / (m - 1)
+        if var <= 0.0:
+            continue
+        std = np.sqrt(var)
+        z_scores[i] = (rates[i] - mean) / std
+        if rates[i] > mean + sigma * std:
+            flags[i] = 1
+
+    return rates, z_scores, flags
+
+# ============================================================================
+# TIME BUCKETING
+# ============================================================================
+
+@njit(cache=True)
+def bucket_sum(ts_ns, values, bucket_ns):
+    """
+    Sum the rows of an (n, k) int64 matrix into fixed-width time buckets
+
+    ts_ns holds each row's timestamp in int64 nanoseconds, sorted ascending
+    with no NaT (ValueError otherwise).
+    Buckets are aligned to multiples of bucket_ns (like pandas resample) and
+    written densely, empty buckets included. Returns (origin_ns, sums) where
+    bucket b starts at origin_ns + b * bucket_ns.
+    """
+    n, k = values.shape
+    if n == 0:
+        return np.int64(0), np.zeros((0, k), dtype=np.int64)
+
+    # A timestamp before origin (NaT is INT64_MIN, unsorted input) would
+    # index out of bounds or size the output from an overflowed span
+    if ts_ns[0] == NAT_NS:
+        raise ValueError("bucket_sum: NaT timestamp")
+    for i in range(1, n):
+        if ts_ns[i] < ts_ns[i - 1]:
+            raise ValueError("bucket_sum: timestamps must be sorted and not NaT")
+
+    origin = ts_ns[0] - ts_ns[0] % bucket_ns
+    n_buckets = (ts_ns[n - 1] - origin) // bucket_ns + 1
+    out = np.zeros((n_buckets, k), dtype=np.int64)
+    for i in range(n):
+        b = (ts_ns[i] - origin) // bucket_ns
+        for j in range(k):
+            out[b, j] += values[i, j]
+
+    return origin, out
+
+# ============================================================================
+# LIVE WINDOW SCORING
+# ============================================================================
+
+@njit(cache=True)
+def analyze_kernel(n_records, sums, warn, crit, mean, inv_std,
+                   sigma_warning, sigma_critical):
+    """
+    Score per-status window totals against rule and baseline thresholds
+
+    n_records/sums are the monitor's running record counts and transaction
+    sums per status_id. warn/crit hold rule thresholds and mean/inv_std the
+    baseline per status_id, NaN where a status has no rule or no baseline.
+    Returns per-status (rates in %, z-scores, rule level, statistical level),
+    levels being 0 = none, 1 = warning, 2 = critical.
+    """
+    k = warn.shape[0]
+    total = sums.sum()
+    rates = np.zeros(k, dtype=np.float64)
+    z_scores = np.zeros(k, dtype=np.float64)
+    rule_level = np.zeros(k, dtype=np.uint8)
+    stat_level = np.zeros(k, dtype=np.uint8)
+    for j in range(k):
+        if n_records[j] == 0:
+            continue
+        if total > 0:
+            rates[j] = sums[j] / total * 100.0
+
+        if not np.isnan(crit[j]):
+            if rates[j] >= crit[j]:
+                rule_level[j] = 2
+            elif rates[j] >= warn[j]:
+                rule_level[j] = 1
+
+        if not np.isnan(mean[j]):
+            z = abs((rates[j] - mean[j]) * inv_std[j])
+            z_scores[j] = z
+            if z >= sigma_critical:
+                stat_level[j] = 2
+            elif z >= sigma_warning:
+                stat_level[j] = 1
+
+    return rates, z_scores, rule_level, stat_level
+
+# ============================================================================
+# HISTORICAL SUMMARY
+# ============================================================================
+
+@njit(cache=True)
+def summarize_rates(rates, warn, crit):
+    """
+    Per-column rate statistics and threshold counts in a single pass
+
+    rates is a C-contiguous (minutes, statuses) float64 matrix with NaN where
+    a status had no rows that minute; NaNs are skipped. warn/crit hold one
+    threshold per column. Returns (means, sample stds, maxes, mins, minutes
+    above warn, minutes above crit); stats are NaN for columns with too few
+    values.
+    """
+    m, k = rates.shape
+    n = np.zeros(k, dtype=np.int64)
+    means = np.zeros(k, dtype=np.float64)
+    m2 = np.zeros(k, dtype=np.float64)
+    maxes = np.full(k, np.nan)
+    mins = np.full(k, np.nan)
+    n_warn = np.zeros(k, dtype=np.int64)
+    n_crit = np.zeros(k, dtype=np.int64)
+
+    for i in range(m):
+        for j in range(k):
+            r = rates[i, j]
+            if np.isnan(r):
+                continue
+            # Welford update for mean / variance
+            n[j] += 1
+            delta = r - means[j]
+            means[j] += delta / n[j]
+            m2[j] += delta * (r - means[j])
+            if n[j] == 1 or r > maxes[j]:
+                maxes[j] = r
+            if n[j] == 1 or r < mins[j]:
+                mins[j] = r
+            if r > warn[j]:
+                n_warn[j] += 1
+            if r > crit[j]:
+                n_crit[j] += 1
+
+    stds = np.full(k, np.nan)
+    for j in range(k):
+        if n[j] == 0:
+            means[j] = np.nan
+        elif n[j] > 1:
+            stds[j] = np.sqrt(m2[j] / (n[j] - 1))
+
+    return means, stds, maxes, mins, n_warn, n_crit
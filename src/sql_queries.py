@@ -1,8 +1,17 @@
 """
 SQL Queries for Transaction Monitoring System
 Queries to organize, analyze, and detect anomalies in transaction data
+
+Look-back windows are bound as :window (a datetime() modifier such as
+'-1 hour', defaults in QUERY_WINDOWS) so the SQL text stays constant and
+sqlite3's statement cache reuses the prepared statements.
 """
 
+import math
+
+# status_id literals below (0 = approved, 1 = failed, 2 = denied, 3 = reversed,
+# 4 = backend_reversed, 5 = refunded) index STATUS_NAMES in SCHEMA TUNING
+
 # ============================================================================
 # DATA ORGANIZATION QUERIES
 # ============================================================================
@@ -11,15 +20,15 @@ Queries to organize, analyze, and detect anomalies in transaction data
 AGGREGATE_BY_MINUTE = """
 SELECT 
     timestamp,
-    SUM(CASE WHEN status = 'approved' THEN count ELSE 0 END) as approved,
-    SUM(CASE WHEN status = 'failed' THEN count ELSE 0 END) as failed,
-    SUM(CASE WHEN status = 'denied' THEN count ELSE 0 END) as denied,
-    SUM(CASE WHEN status = 'reversed' THEN count ELSE 0 END) as reversed,
-    SUM(CASE WHEN status = 'backend_reversed' THEN count ELSE 0 END) as backend_reversed,
-    SUM(CASE WHEN status = 'refunded' THEN count ELSE 0 END) as refunded,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 0), 0) as approved,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 1), 0) as failed,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 2), 0) as denied,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 3), 0) as reversed,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 4), 0) as backend_reversed,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 5), 0) as refunded,
     SUM(count) as total_transactions
 FROM transactions
-WHERE timestamp >= datetime('now', '-1 hour')
+WHERE timestamp >= datetime('now', :window)
 GROUP BY timestamp
 ORDER BY timestamp DESC;
 """
@@ -29,29 +38,29 @@ FAILURE_RATES = """
 SELECT 
     strftime('%Y-%m-%d %H:%M', timestamp) as minute,
     SUM(count) as total,
-    SUM(CASE WHEN status IN ('failed', 'denied', 'reversed', 'backend_reversed') THEN count ELSE 0 END) as failures,
+    COALESCE(SUM(count) FILTER (WHERE status_id IN (1, 2, 3, 4)), 0) as failures,
     ROUND(
-        100.0 * SUM(CASE WHEN status IN ('failed', 'denied', 'reversed', 'backend_reversed') THEN count ELSE 0 END) / 
+        100.0 * COALESCE(SUM(count) FILTER (WHERE status_id IN (1, 2, 3, 4)), 0) / 
         NULLIF(SUM(count), 0), 
         2
     ) as failure_rate,
     ROUND(
-        100.0 * SUM(CASE WHEN status = 'failed' THEN count ELSE 0 END) / 
+        100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 1), 0) / 
         NULLIF(SUM(count), 0), 
         2
     ) as failed_rate,
     ROUND(
-        100.0 * SUM(CASE WHEN status = 'denied' THEN count ELSE 0 END) / 
+        100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 2), 0) / 
         NULLIF(SUM(count), 0), 
         2
     ) as denied_rate,
     ROUND(
-        100.0 * SUM(CASE WHEN status = 'reversed' THEN count ELSE 0 END) / 
+        100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 3), 0) / 
         NULLIF(SUM(count), 0), 
         2
     ) as reversed_rate
 FROM transactions
-WHERE timestamp >= datetime('now', '-1 hour')
+WHERE timestamp >= datetime('now', :window)
 GROUP BY minute
 ORDER BY minute DESC;
 """
@@ -65,15 +74,15 @@ FAILED_TRANSACTION_SPIKES = """
 WITH minute_stats AS (
     SELECT 
         strftime('%Y-%m-%d %H:%M', timestamp) as minute,
-        SUM(CASE WHEN status = 'failed' THEN count ELSE 0 END) as failed_count,
+        COALESCE(SUM(count) FILTER (WHERE status_id = 1), 0) as failed_count,
         SUM(count) as total_count,
         ROUND(
-            100.0 * SUM(CASE WHEN status = 'failed' THEN count ELSE 0 END) / 
+            100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 1), 0) / 
             NULLIF(SUM(count), 0), 
             2
         ) as failed_rate
     FROM transactions
-    WHERE timestamp >= datetime('now', '-2 hours')
+    WHERE timestamp >= datetime('now', :window)
     GROUP BY minute
 ),
 baseline AS (
@@ -105,15 +114,15 @@ DENIED_TRANSACTION_ANOMALIES = """
 WITH recent_data AS (
     SELECT 
         strftime('%Y-%m-%d %H:%M', timestamp) as minute,
-        SUM(CASE WHEN status = 'denied' THEN count ELSE 0 END) as denied_count,
+        COALESCE(SUM(count) FILTER (WHERE status_id = 2), 0) as denied_count,
         SUM(count) as total_count,
         ROUND(
-            100.0 * SUM(CASE WHEN status = 'denied' THEN count ELSE 0 END) / 
+            100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 2), 0) / 
             NULLIF(SUM(count), 0), 
             2
         ) as denied_rate
     FROM transactions
-    WHERE timestamp >= datetime('now', '-1 hour')
+    WHERE timestamp >= datetime('now', :window)
     GROUP BY minute
 ),
 thresholds AS (
@@ -149,13 +158,15 @@ LIMIT 10;
 CURRENT_VS_BASELINE = """
 WITH current_stats AS (
     SELECT 
-        status,
-        AVG(count) as current_avg,
-        SUM(count) as current_total,
+        s.name as status,
+        AVG(t.count) as current_avg,
+        SUM(t.count) as current_total,
         COUNT(*) as current_samples
-    FROM transactions
-    WHERE timestamp >= datetime('now', '-15 minutes')
-    GROUP BY status
+    FROM transactions t
+    JOIN status_lookup s ON s.id = t.status_id
+    WHERE t.timestamp >= datetime('now', :window)
+      AND t.status_id IN (1, 2, 3, 4)  -- failed, denied, reversed, backend_reversed
+    GROUP BY t.status_id
 ),
 historical_baseline AS (
     SELECT 
@@ -186,7 +197,6 @@ SELECT
     END as status_flag
 FROM current_stats c
 LEFT JOIN historical_baseline h ON c.status = h.status
-WHERE c.status IN ('failed', 'denied', 'reversed', 'backend_reversed')
 ORDER BY ABS(z_score) DESC;
 """
 
@@ -205,7 +215,7 @@ SELECT
     MIN(timestamp) as first_alert,
     MAX(timestamp) as last_alert
 FROM alerts
-WHERE timestamp >= datetime('now', '-1 hour')
+WHERE timestamp >= datetime('now', :window)
 GROUP BY severity, status
 ORDER BY 
     CASE severity 
@@ -229,7 +239,7 @@ SELECT
     message,
     created_at
 FROM alerts
-WHERE timestamp >= datetime('now', '-1 hour')
+WHERE timestamp >= datetime('now', :window)
 ORDER BY created_at DESC
 LIMIT 20;
 """
@@ -237,16 +247,17 @@ LIMIT 20;
 # Query 8: Transaction volume trends (5-minute buckets)
 TRANSACTION_TRENDS = """
 SELECT 
-    strftime('%Y-%m-%d %H:', timestamp) || 
-    CAST((CAST(strftime('%M', timestamp) AS INTEGER) / 5) * 5 AS TEXT) as time_bucket,
-    status,
-    SUM(count) as total_count,
-    AVG(count) as avg_count,
-    MIN(count) as min_count,
-    MAX(count) as max_count
-FROM transactions
-WHERE timestamp >= datetime('now', '-2 hours')
-GROUP BY time_bucket, status
+    strftime('%Y-%m-%d %H:', t.timestamp) || 
+    CAST((CAST(strftime('%M', t.timestamp) AS INTEGER) / 5) * 5 AS TEXT) as time_bucket,
+    s.name as status,
+    SUM(t.count) as total_count,
+    AVG(t.count) as avg_count,
+    MIN(t.count) as min_count,
+    MAX(t.count) as max_count
+FROM transactions t
+JOIN status_lookup s ON s.id = t.status_id
+WHERE t.timestamp >= datetime('now', :window)
+GROUP BY time_bucket, t.status_id
 ORDER BY time_bucket DESC, status;
 """
 
@@ -254,14 +265,15 @@ ORDER BY time_bucket DESC, status;
 CONSECUTIVE_ANOMALIES = """
 WITH anomaly_minutes AS (
     SELECT 
-        strftime('%Y-%m-%d %H:%M', timestamp) as minute,
-        status,
-        SUM(count) as count,
-        SUM(count) * 100.0 / SUM(SUM(count)) OVER (PARTITION BY strftime('%Y-%m-%d %H:%M', timestamp)) as rate
-    FROM transactions
-    WHERE timestamp >= datetime('now', '-1 hour')
-      AND status IN ('failed', 'denied', 'reversed')
-    GROUP BY minute, status
+        strftime('%Y-%m-%d %H:%M', t.timestamp) as minute,
+        s.name as status,
+        SUM(t.count) as count,
+        SUM(t.count) * 100.0 / SUM(SUM(t.count)) OVER (PARTITION BY strftime('%Y-%m-%d %H:%M', t.timestamp)) as rate
+    FROM transactions t
+    JOIN status_lookup s ON s.id = t.status_id
+    WHERE t.timestamp >= datetime('now', :window)
+      AND t.status_id IN (1, 2, 3)  -- failed, denied, reversed
+    GROUP BY minute, t.status_id
 ),
 anomaly_flags AS (
     SELECT 
@@ -297,23 +309,182 @@ PERFORMANCE_SUMMARY = """
 SELECT 
     COUNT(DISTINCT strftime('%Y-%m-%d %H:%M', timestamp)) as minutes_tracked,
     SUM(count) as total_transactions,
-    SUM(CASE WHEN status = 'approved' THEN count ELSE 0 END) as approved,
-    SUM(CASE WHEN status = 'failed' THEN count ELSE 0 END) as failed,
-    SUM(CASE WHEN status = 'denied' THEN count ELSE 0 END) as denied,
-    SUM(CASE WHEN status = 'reversed' THEN count ELSE 0 END) as reversed,
-    SUM(CASE WHEN status = 'backend_reversed' THEN count ELSE 0 END) as backend_reversed,
-    ROUND(100.0 * SUM(CASE WHEN status = 'approved' THEN count ELSE 0 END) / SUM(count), 2) as approval_rate,
-    ROUND(100.0 * SUM(CASE WHEN status = 'failed' THEN count ELSE 0 END) / SUM(count), 2) as failure_rate,
-    ROUND(100.0 * SUM(CASE WHEN status = 'denied' THEN count ELSE 0 END) / SUM(count), 2) as denial_rate,
-    ROUND(100.0 * SUM(CASE WHEN status = 'reversed' THEN count ELSE 0 END) / SUM(count), 2) as reversal_rate
+    COALESCE(SUM(count) FILTER (WHERE status_id = 0), 0) as approved,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 1), 0) as failed,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 2), 0) as denied,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 3), 0) as reversed,
+    COALESCE(SUM(count) FILTER (WHERE status_id = 4), 0) as backend_reversed,
+    ROUND(100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 0), 0) / SUM(count), 2) as approval_rate,
+    ROUND(100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 1), 0) / SUM(count), 2) as failure_rate,
+    ROUND(100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 2), 0) / SUM(count), 2) as denial_rate,
+    ROUND(100.0 * COALESCE(SUM(count) FILTER (WHERE status_id = 3), 0) / SUM(count), 2) as reversal_rate
 FROM transactions
-WHERE timestamp >= datetime('now', '-1 hour');
+WHERE timestamp >= datetime('now', :window);
+"""
+
+# ============================================================================
+# DASHBOARD QUERIES
+# ============================================================================
+
+# Alert points for the dashboard's anomaly timeline
+ALERT_TIMELINE = """
+SELECT 
+    timestamp,
+    severity,
+    status,
+    anomaly_score
+FROM alerts
+WHERE timestamp >= datetime('now', :window)
+ORDER BY timestamp;
+"""
+
+# ============================================================================
+# SCHEMA TUNING
+# ============================================================================
+
+# transactions.status_id encoding (list index == id), shared with the
+# monitor's in-memory buffers and the dashboard; queries above filter on
+# these ids as literals, so reordering this list means updating them too
+STATUS_NAMES = ['approved', 'failed', 'denied', 'reversed', 'backend_reversed', 'refunded']
+
+STATUS_LOOKUP_DDL = """
+CREATE TABLE IF NOT EXISTS status_lookup (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+)
+"""
+
+STATUS_LOOKUP_INSERT = "INSERT OR IGNORE INTO status_lookup (id, name) VALUES (?, ?)"
+
+# Rows of a TEXT-status transactions table that MIGRATE_TEXT_STATUS drops
+COUNT_UNKNOWN_TEXT_STATUS = """
+SELECT COUNT(*) FROM transactions
+WHERE status IS NULL OR status NOT IN (SELECT name FROM status_lookup)
+"""
+
+# One-off rewrite of a transactions table that still stores status as TEXT
+# (rows with a status missing from status_lookup are dropped); run it inside
+# a single transaction so a failure can't strand rows in the renamed table
+MIGRATE_TEXT_STATUS = [
+    "ALTER TABLE transactions RENAME TO transactions_text_status",
+    """
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TIMESTAMP NOT NULL,
+        status_id INTEGER NOT NULL REFERENCES status_lookup (id),
+        count INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    INSERT INTO transactions (id, timestamp, status_id, count, created_at)
+    SELECT t.id, t.timestamp, s.id, t.count, t.created_at
+    FROM transactions_text_status t
+    JOIN status_lookup s ON s.name = t.status
+    """,
+    "DROP TABLE transactions_text_status"
+]
+
+# Covering indexes: the windowed aggregates above are answered from the
+# index B-tree alone (timestamp range, status_id, count) without table lookups
+INDEX_DDL = [
+    "DROP INDEX IF EXISTS idx_tx_ts_status",
+    """
+    CREATE INDEX IF NOT EXISTS idx_tx_cover
+    ON transactions (timestamp, status_id, count)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_alerts_ts
+    ON alerts (timestamp, severity)
+    """
+]
+
+# Applied on every long-lived connection
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456"
+]
+
+# ============================================================================
+# WRITE STATEMENTS
+# ============================================================================
+# Fixed SQL text so the writer's executemany reuses one prepared statement
+# per batch (and sqlite3's statement cache across batches)
+
+INSERT_TRANSACTION = "INSERT INTO transactions (timestamp, status_id, count) VALUES (?, ?, ?)"
+
+INSERT_ALERT = """
+INSERT INTO alerts
+(timestamp, alert_type, severity, status, metric_value, threshold_value, anomaly_score, message)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# ============================================================================
+# HOT WINDOW MIRROR
+# ============================================================================
+# An in-memory main database with the monitor's database attached as `src`
+# holds a copy of the recent transactions, so refresh queries never touch
+# disk. Unqualified `transactions` resolves to the copy; other tables
+# (alerts, baseline_stats) resolve to src.
+
+HOT_WINDOW_DDL = [
+    "CREATE TABLE IF NOT EXISTS main.transactions AS SELECT * FROM src.transactions WHERE 0",
+    """
+    CREATE INDEX IF NOT EXISTS main.idx_tx_cover
+    ON transactions (timestamp, status_id, count)
+    """
+]
+
+# Highest row id in the source; the upper bound of the next sync
+HOT_WINDOW_MAX_ID = "SELECT COALESCE(MAX(id), 0) FROM src.transactions;"
+
+# Copy rows added since the last sync (:last_id, :max_id] that fall in :window
+HOT_WINDOW_SYNC = """
+INSERT INTO main.transactions
+SELECT * FROM src.transactions
+WHERE id > :last_id AND id <= :max_id
+  AND timestamp >= datetime('now', :window);
+"""
+
+# Drop rows that have aged out of :window
+HOT_WINDOW_EVICT = """
+DELETE FROM main.transactions
+WHERE timestamp < datetime('now', :window);
 """
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+class WelfordStd:
+    """STDEV() aggregate: sample standard deviation in one pass (Welford)"""
+    
+    __slots__ = ('n', 'mean', 'm2')
+    
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+    
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+    
+    def finalize(self):
+        if self.n < 2:
+            return None
+        return math.sqrt(self.m2 / (self.n - 1))
+
+def register_functions(conn):
+    """Register the SQL functions the queries use that SQLite lacks (STDEV)"""
+    conn.create_aggregate('STDEV', 1, WelfordStd)
+
 def get_query_map():
     """Return dictionary of all queries"""
     return {
@@ -328,3 +499,17 @@ def get_query_map():
         'consecutive_anomalies': CONSECUTIVE_ANOMALIES,
         'performance_summary': PERFORMANCE_SUMMARY
     }
+
+# Default :window binding for each query in get_query_map()
+QUERY_WINDOWS = {
+    'aggregate_by_minute': '-1 hour',
+    'failure_rates': '-1 hour',
+    'failed_spikes': '-2 hours',
+    'denied_anomalies': '-1 hour',
+    'current_vs_baseline': '-15 minutes',
+    'alert_summary': '-1 hour',
+    'recent_alerts': '-1 hour',
+    'transaction_trends': '-2 hours',
+    'consecutive_anomalies': '-1 hour',
+    'performance_summary': '-1 hour'
+}
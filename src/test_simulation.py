@@ -3,18 +3,43 @@ Test Simulation for Transaction Monitoring System
 Simulates real-time transaction data and demonstrates anomaly detection
 """
 
+import asyncio
+import aiohttp
 import requests
 import pandas as pd
-import time
+import numpy as np
 import json
+import sys
 from datetime import datetime
 
+from anomaly_kernels import summarize_rates
+
+# Marker printed next to each simulated record
+_STATUS_EMOJI = {
+    'approved': '✓',
+    'failed': '✗',
+    'denied': '⊘',
+    'reversed': '↶',
+    'backend_reversed': '⇄',
+    'refunded': '↩'
+}
+
 class MonitoringSystemSimulator:
     """Simulate transaction data and test the monitoring system"""
     
+    # Requests in flight at once; the stream is sent in batches of this size
+    MAX_IN_FLIGHT = 32
+    
     def __init__(self, api_url='http://localhost:5000'):
         self.api_url = api_url
         self.transaction_data = None
+        
+        # Keep-alive connection pool for the synchronous endpoint checks
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.MAX_IN_FLIGHT)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         self.load_historical_data()
     
     def load_historical_data(self):
@@ -25,66 +50,81 @@ class MonitoringSystemSimulator:
     
     def simulate_realtime_stream(self, num_records=100, delay=0.1):
         """Simulate real-time transaction stream"""
+        asyncio.run(self._simulate_stream(num_records, delay))
+    
+    async def _simulate_stream(self, num_records, delay):
+        """Send the sample in concurrent batches, pausing `delay` between batches"""
         print(f"\n{'='*80}")
         print("SIMULATING REAL-TIME TRANSACTION STREAM")
         print(f"{'='*80}\n")
         
-        # Take a sample of records
-        sample_data = self.transaction_data.sample(n=min(num_records, len(self.transaction_data)))
+        # Take a sample of records as positional picks from the column arrays
+        df = self.transaction_data
+        idxs = np.random.choice(len(df), size=min(num_records, len(df)), replace=False)
+        timestamps = np.datetime_as_string(df['timestamp'].to_numpy()[idxs], unit='s')
+        statuses = df['status'].to_numpy()[idxs]
+        counts = df['count'].to_numpy()[idxs]
+        rows = list(zip(timestamps.tolist(), statuses.tolist(), counts.tolist()))
         
         alerts_triggered = 0
+        url = f'{self.api_url}/api/transaction'
         
-        for idx, row in sample_data.iterrows():
-            # Prepare transaction data
+        async def send(session, row):
+            timestamp, status, count = row
             transaction = {
-                'timestamp': row['timestamp'].isoformat(),
-                'status': row['status'],
-                'count': int(row['count'])
+                'timestamp': timestamp,
+                'status': status,
+                'count': count
             }
-            
-            # Send to API
-            try:
-                response = requests.post(
-                    f'{self.api_url}/api/transaction',
-                    json=transaction,
-                    timeout=5
+            async with session.post(url, json=transaction) as response:
+                if response.status != 200:
+                    return response.status, None
+                return response.status, await response.json()
+        
+        timeout = aiohttp.ClientTimeout(total=5)
+        connector = aiohttp.TCPConnector(limit=self.MAX_IN_FLIGHT)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            for start in range(0, len(rows), self.MAX_IN_FLIGHT):
+                batch = rows[start:start + self.MAX_IN_FLIGHT]
+                results = await asyncio.gather(
+                    *[send(session, row) for row in batch],
+                    return_exceptions=True
                 )
                 
-                if response.status_code == 200:
-                    result = response.json()
+                # Report in sample order once the whole batch is back,
+                # as a single write per batch
+                lines = []
+                for (timestamp, status, count), outcome in zip(batch, results):
+                    if isinstance(outcome, aiohttp.ClientConnectorError):
+                        sys.stdout.write(''.join(lines))
+                        print("✗ API not running. Start with: python transaction_monitor.py")
+                        return
+                    if isinstance(outcome, Exception):
+                        lines.append(f"✗ Error: {outcome!r}\n")
+                        continue
                     
-                    # Print status
-                    status_emoji = {
-                        'approved': '✓',
-                        'failed': '✗',
-                        'denied': '⊘',
-                        'reversed': '↶',
-                        'backend_reversed': '⇄',
-                        'refunded': '↩'
-                    }
-                    
-                    emoji = status_emoji.get(row['status'], '•')
-                    print(f"{emoji} [{row['timestamp']}] {row['status']:20} Count: {row['count']:3} ", end='')
+                    status_code, result = outcome
+                    if result is None:
+                        lines.append(f"✗ API Error: {status_code}\n")
+                        continue
                     
+                    # Print status
+                    line = f"{_STATUS_EMOJI.get(status, '•')} [{timestamp}] {status:20} Count: {count:3} "
                     if result['should_alert']:
                         alerts_triggered += 1
-                        print(f"🚨 ALERT! Score: {result['anomaly_score']:.1f}")
+                        line += f"🚨 ALERT! Score: {result['anomaly_score']:.1f}\n"
                         for alert in result['alerts']:
-                            print(f"   → {alert['severity']}: {alert['message']}")
+                            line += f"   → {alert['severity']}: {alert['message']}\n"
                     else:
-                        print("OK")
+                        line += "OK\n"
+                    lines.append(line)
                 
-                else:
-                    print(f"✗ API Error: {response.status_code}")
-                    
-            except requests.exceptions.ConnectionError:
-                print("✗ API not running. Start with: python transaction_monitor.py")
-                return
-            except Exception as e:
-                print(f"✗ Error: {e}")
-            
-            # Delay to simulate real-time
-            time.sleep(delay)
+                sys.stdout.write(''.join(lines))
+                sys.stdout.flush()
+                
+                # Delay between batches to pace the stream (0 = as fast as possible)
+                if delay:
+                    await asyncio.sleep(delay)
         
         print(f"\n{'='*80}")
         print(f"SIMULATION COMPLETE")
@@ -112,9 +152,9 @@ class MonitoringSystemSimulator:
             
             try:
                 if method == 'GET':
-                    response = requests.get(f'{self.api_url}{endpoint}', timeout=5)
+                    response = self.session.get(f'{self.api_url}{endpoint}', timeout=5)
                 else:
-                    response = requests.post(
+                    response = self.session.post(
                         f'{self.api_url}{endpoint}',
                         json=data,
                         timeout=5
@@ -141,40 +181,48 @@ class MonitoringSystemSimulator:
         print(f"{'='*80}\n")
         
         # Calculate rates by minute
-        df = self.transaction_data.copy()
-        df['minute'] = df['timestamp'].dt.floor('min')
+        df = self.transaction_data
+        minute = df['timestamp'].dt.floor('min').rename('minute')
         
-        # Aggregate by minute
-        minute_totals = df.groupby('minute')['count'].sum()
+        # One pass: minute x status counts (NaN where a status has no rows
+        # that minute, so those minutes stay out of its stats)
+        pivot = df.groupby([minute, 'status'], observed=True)['count'].sum().unstack()
+        minute_totals = pivot.sum(axis=1)
         
-        for status in ['failed', 'denied', 'reversed', 'backend_reversed']:
-            status_data = df[df['status'] == status]
-            status_by_minute = status_data.groupby('minute')['count'].sum()
-            
-            rates = (status_by_minute / minute_totals * 100).dropna()
+        problem_statuses = ['failed', 'denied', 'reversed', 'backend_reversed']
+        status_counts = pivot.reindex(columns=problem_statuses)
+        all_rates = status_counts.div(minute_totals, axis=0) * 100
+        
+        # Alert thresholds per problem status; every statistic below comes
+        # from one fused pass over the minute x status rate matrix
+        warning_thresholds = np.array([2.0, 10.0, 2.0, 2.0])
+        critical_thresholds = np.array([4.0, 15.0, 4.0, 4.0])
+        rate_matrix = np.ascontiguousarray(all_rates.to_numpy(dtype=np.float64))
+        means, stds, maxes, mins, warning_counts, critical_counts = summarize_rates(
+            rate_matrix, warning_thresholds, critical_thresholds
+        )
+        
+        for j, status in enumerate(problem_statuses):
+            threshold_warning = warning_thresholds[j]
+            threshold_critical = critical_thresholds[j]
             
             print(f"\n{status.upper()} Transactions:")
-            print(f"  Mean Rate: {rates.mean():.2f}%")
-            print(f"  Std Dev: {rates.std():.2f}%")
-            print(f"  Max Rate: {rates.max():.2f}%")
-            print(f"  Min Rate: {rates.min():.2f}%")
+            print(f"  Mean Rate: {means[j]:.2f}%")
+            print(f"  Std Dev: {stds[j]:.2f}%")
+            print(f"  Max Rate: {maxes[j]:.2f}%")
+            print(f"  Min Rate: {mins[j]:.2f}%")
             
-            # Identify anomaly minutes
-            threshold_warning = 2.0 if status == 'failed' else (10.0 if status == 'denied' else 2.0)
-            threshold_critical = 4.0 if status == 'failed' else (15.0 if status == 'denied' else 4.0)
+            print(f"  Warning Minutes (>{threshold_warning}%): {warning_counts[j]}")
+            print(f"  Critical Minutes (>{threshold_critical}%): {critical_counts[j]}")
             
-            warning_minutes = rates[rates > threshold_warning]
-            critical_minutes = rates[rates > threshold_critical]
-            
-            print(f"  Warning Minutes (>{threshold_warning}%): {len(warning_minutes)}")
-            print(f"  Critical Minutes (>{threshold_critical}%): {len(critical_minutes)}")
-            
-            if len(critical_minutes) > 0:
+            if critical_counts[j] > 0:
                 print(f"  Sample Critical Events:")
-                for timestamp, rate in critical_minutes.head(3).items():
-                    count = status_by_minute.get(timestamp, 0)
-                    total = minute_totals.get(timestamp, 1)
-                    print(f"    [{timestamp}] Rate: {rate:.2f}% ({count}/{total})")
+                critical_rows = np.flatnonzero(rate_matrix[:, j] > threshold_critical)[:3]
+                for i in critical_rows:
+                    timestamp = all_rates.index[i]
+                    count = int(status_counts.iat[i, j])
+                    total = int(minute_totals.iat[i])
+                    print(f"    [{timestamp}] Rate: {rate_matrix[i, j]:.2f}% ({count}/{total})")
 
 def main():
     """Main test function"""
@@ -197,15 +245,17 @@ def main():
     print("\nOr test individual endpoints with: python test_simulation.py --test-api")
 
 if __name__ == '__main__':
-    import sys
-    
     if '--simulate' in sys.argv:
         simulator = MonitoringSystemSimulator()
         num_records = 50
         if '--num' in sys.argv:
             idx = sys.argv.index('--num')
             num_records = int(sys.argv[idx + 1])
-        simulator.simulate_realtime_stream(num_records=num_records, delay=0.5)
+        delay = 0.5
+        if '--delay' in sys.argv:
+            idx = sys.argv.index('--delay')
+            delay = float(sys.argv[idx + 1])
+        simulator.simulate_realtime_stream(num_records=num_records, delay=delay)
     
     elif '--test-api' in sys.argv:
         simulator = MonitoringSystemSimulator()
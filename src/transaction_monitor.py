@@ -3,17 +3,30 @@ CloudWalk Transaction Monitoring & Alert System
 Real-time anomaly detection for transaction failures, denials, and reversals
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from datetime import datetime
 from collections import deque
 import sqlite3
 import json
+import orjson
 import logging
+import queue
+import threading
+import time
+import atexit
 from typing import Dict, List, Tuple
 
+from sql_queries import (
+    CONNECTION_PRAGMAS, COUNT_UNKNOWN_TEXT_STATUS, INDEX_DDL, INSERT_ALERT, INSERT_TRANSACTION,
+    MIGRATE_TEXT_STATUS, STATUS_LOOKUP_DDL, STATUS_LOOKUP_INSERT, STATUS_NAMES
+)
+from anomaly_kernels import analyze_kernel
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +37,11 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+# Status codes used by the ring buffer and the transactions table (index == status id)
+STATUSES = STATUS_NAMES
+STATUS_TO_ID = {status: i for i, status in enumerate(STATUSES)}
+PROBLEM_STATUS_IDS = [STATUS_TO_ID[s] for s in ('failed', 'denied', 'reversed', 'backend_reversed')]
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -64,28 +82,98 @@ class MonitoringConfig:
 class TransactionDataStore:
     """In-memory storage with SQLite persistence"""
     
-    def __init__(self, db_path='transactions_monitor.db'):
+    # Background writer: flush after this many rows or this many seconds
+    WRITE_BATCH_SIZE = 500
+    WRITE_BATCH_WAIT = 0.05
+    
+    # Recent records kept in memory
+    BUFFER_SIZE = 10000
+    
+    # Largest count the int32 `cnt` array holds
+    MAX_COUNT = int(np.iinfo(np.int32).max)
+    
+    # How far ahead of the local clock a client timestamp may be
+    MAX_CLOCK_SKEW_NS = 60 * 1_000_000_000
+    
+    def __init__(self, db_path='transactions_monitor.db', window_minutes=MonitoringConfig.WINDOW_MEDIUM):
         self.db_path = db_path
-        self.recent_data = deque(maxlen=10000)  # Keep last 10k records in memory
+        
+        # Ring buffer of the last BUFFER_SIZE records, one array per field
+        self.ts = np.empty(self.BUFFER_SIZE, dtype='int64')         # ns since epoch
+        self.status_id = np.empty(self.BUFFER_SIZE, dtype='int8')   # index into STATUSES
+        self.cnt = np.empty(self.BUFFER_SIZE, dtype='int32')
+        self.head = 0
+        self.size = 0
+        self.version = 0  # bumped on every add; invalidates cached API bodies
+        self._lock = threading.Lock()
+        
+        # Running per-status totals over the analysis window. Records leave
+        # in arrival order from `tail` once their timestamp is older than
+        # the cutoff; `counted` marks slots included in the totals. While
+        # arrival order and timestamp order disagree (`ordered` False) the
+        # totals are recounted by mask instead
+        self.window_ns = window_minutes * 60 * 1_000_000_000
+        self.counted = np.zeros(self.BUFFER_SIZE, dtype=bool)
+        self.tail = 0
+        self.pending = 0
+        self.ordered = True
+        self.win_n = np.zeros(len(STATUSES), dtype='int64')
+        self.win_sum = np.zeros(len(STATUSES), dtype='int64')
+        self.win_sumsq = np.zeros(len(STATUSES), dtype='float64')
+        
         self._init_database()
         self._load_historical_baseline()
+        
+        # Writes are queued and persisted in batches by a single writer
+        # thread, so one commit (fsync) covers many rows
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        for pragma in CONNECTION_PRAGMAS:
+            self.conn.execute(pragma)
+        self.write_q = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name='sqlite-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
     
     def _init_database(self):
         """Initialize SQLite database"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # Status id -> name lookup
+        cursor.execute(STATUS_LOOKUP_DDL)
+        cursor.executemany(STATUS_LOOKUP_INSERT, list(enumerate(STATUSES)))
+        
         # Create transactions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS transactions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TIMESTAMP NOT NULL,
-                status TEXT NOT NULL,
+                status_id INTEGER NOT NULL REFERENCES status_lookup (id),
                 count INTEGER NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         
+        # Databases created before status_id still have a TEXT status column
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(transactions)")}
+        if 'status_id' not in columns:
+            logger.info("Migrating transactions.status to status_id")
+            dropped = cursor.execute(COUNT_UNKNOWN_TEXT_STATUS).fetchone()[0]
+            if dropped:
+                logger.warning(f"Migration drops {dropped} transactions with an unknown status")
+            
+            # DDL autocommits unless inside an explicit transaction
+            conn.commit()
+            try:
+                cursor.execute("BEGIN")
+                for stmt in MIGRATE_TEXT_STATUS:
+                    cursor.execute(stmt)
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+        
         # Create alerts table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS alerts (
@@ -114,6 +202,10 @@ class TransactionDataStore:
             )
         ''')
         
+        # Covering indexes for the windowed queries in sql_queries
+        for ddl in INDEX_DDL:
+            cursor.execute(ddl)
+        
         conn.commit()
         conn.close()
         logger.info("Database initialized successfully")
@@ -132,32 +224,78 @@ class TransactionDataStore:
             self._calculate_baseline_from_files()
         
         self.baseline = df.set_index('status').to_dict('index')
+        
+        # Z-score terms indexed by status_id (NaN mean = no baseline)
+        self.baseline_mean = np.full(len(STATUSES), np.nan)
+        self.baseline_inv_std = np.ones(len(STATUSES))
+        for status, stats in self.baseline.items():
+            if status not in STATUS_TO_ID or 'mean_rate' not in stats:
+                continue
+            sid = STATUS_TO_ID[status]
+            std = stats.get('std_rate', 1.0)
+            self.baseline_mean[sid] = stats['mean_rate']
+            self.baseline_inv_std[sid] = 1.0 / std if std != 0 else 1.0  # Avoid division by zero
+        
+        # /api/baseline body up to the timestamp value, encoded once
+        self.baseline_json_prefix = orjson.dumps(
+            {'baseline': self.baseline}, option=orjson.OPT_SERIALIZE_NUMPY
+        )[:-1] + b',"timestamp":'
+        
         logger.info(f"Loaded baseline statistics for {len(self.baseline)} status types")
     
     def _calculate_baseline_from_files(self):
         """Calculate baseline from historical CSV data"""
         try:
-            df = pd.read_csv('/mnt/user-data/uploads/transactions.csv')
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            # Typed, multi-threaded read; status arrives dictionary-encoded
+            tbl = pacsv.read_csv(
+                '/mnt/user-data/uploads/transactions.csv',
+                convert_options=pacsv.ConvertOptions(column_types={
+                    'timestamp': pa.timestamp('ns'),
+                    'status': pa.dictionary(pa.int32(), pa.string()),
+                    'count': pa.int32()
+                })
+            ).unify_dictionaries().combine_chunks()
+            
+            status_col = tbl['status'].chunk(0)
+            names = status_col.dictionary.to_pylist()
+            codes = status_col.indices.to_numpy()
+            cnt = tbl['count'].to_numpy().astype(np.int64)
+            minute_bin = tbl['timestamp'].to_numpy().view('i8') // 60_000_000_000
+            
+            # Minute x status matrices (transaction sums, row counts) in one pass
+            minute_bin = minute_bin - minute_bin.min()
+            n_minutes, k = int(minute_bin.max()) + 1, len(names)
+            flat = minute_bin * k + codes
+            mat = np.bincount(flat, weights=cnt, minlength=n_minutes * k).reshape(n_minutes, k)
+            has_rows = np.bincount(flat, minlength=n_minutes * k).reshape(n_minutes, k) > 0
+            totals = mat.sum(axis=1)
+            
+            # Per-status row count stats
+            n_rows = np.bincount(codes, minlength=k)
+            row_sums = np.bincount(codes, weights=cnt, minlength=k)
+            row_sums_sq = np.bincount(codes, weights=cnt.astype(np.float64) ** 2, minlength=k)
             
             # Calculate statistics per status
             baseline_stats = []
-            for status in df['status'].unique():
-                status_data = df[df['status'] == status]
+            for sid, status in enumerate(names):
+                n = int(n_rows[sid])
+                if n == 0:
+                    continue
+                mean_count = row_sums[sid] / n
                 
-                # Group by minute to get rates
-                minute_groups = df.groupby(pd.Grouper(key='timestamp', freq='1min'))
-                total_per_minute = minute_groups['count'].sum()
-                status_per_minute = status_data.set_index('timestamp').resample('1min')['count'].sum()
-                
-                rate_per_minute = (status_per_minute / total_per_minute * 100).dropna()
+                # Rate per minute over the status' own time span; minutes in
+                # that span without the status count as 0%, empty minutes are skipped
+                minutes = np.flatnonzero(has_rows[:, sid])
+                span = slice(minutes[0], minutes[-1] + 1)
+                span_totals = totals[span]
+                rate_per_minute = mat[span, sid][span_totals > 0] / span_totals[span_totals > 0] * 100
                 
                 baseline_stats.append({
                     'status': status,
-                    'mean_count': status_data['count'].mean(),
-                    'std_count': status_data['count'].std(),
-                    'mean_rate': rate_per_minute.mean(),
-                    'std_rate': rate_per_minute.std()
+                    'mean_count': mean_count,
+                    'std_count': np.sqrt(max(row_sums_sq[sid] - row_sums[sid] * mean_count, 0.0) / (n - 1)) if n > 1 else None,
+                    'mean_rate': rate_per_minute.mean() if len(rate_per_minute) else None,
+                    'std_rate': rate_per_minute.std(ddof=1) if len(rate_per_minute) > 1 else None
                 })
             
             # Save to database
@@ -176,43 +314,150 @@ class TransactionDataStore:
         except Exception as e:
             logger.warning(f"Could not load baseline from files: {e}")
     
-    def add_transaction(self, timestamp: str, status: str, count: int):
+    def add_transaction(self, timestamp: str, status_id: int, count: int):
         """Add transaction data"""
-        # Add to in-memory storage
-        self.recent_data.append({
-            'timestamp': pd.to_datetime(timestamp),
-            'status': status,
-            'count': count
-        })
+        # Everything that can fail happens before any buffer or total changes
+        ts_ns = self._parse_ts_ns(timestamp)
+        count = int(count)
+        if not 0 <= count <= self.MAX_COUNT:
+            raise ValueError(f"count out of range: {count}")
+        sumsq = float(count) * count
+        now_ns = time.time_ns()
+        if ts_ns > now_ns + self.MAX_CLOCK_SKEW_NS:
+            raise ValueError(f"timestamp is in the future: {timestamp}")
+        cutoff_ns = now_ns - self.window_ns
         
-        # Persist to database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO transactions (timestamp, status, count) VALUES (?, ?, ?)",
-            (timestamp, status, count)
-        )
-        conn.commit()
-        conn.close()
+        # Add to in-memory storage
+        with self._lock:
+            # The slot about to be overwritten leaves the window first
+            if self.pending == self.BUFFER_SIZE:
+                self._evict_one()
+            
+            # An older record behind a newer one breaks tail-order eviction
+            if self.pending and ts_ns < self.ts[(self.head - 1) % self.BUFFER_SIZE]:
+                self.ordered = False
+            
+            self.ts[self.head] = ts_ns
+            self.status_id[self.head] = status_id
+            self.cnt[self.head] = count
+            
+            # Records already older than the window never enter the totals
+            counted = ts_ns >= cutoff_ns
+            self.counted[self.head] = counted
+            if counted:
+                self.win_n[status_id] += 1
+                self.win_sum[status_id] += count
+                self.win_sumsq[status_id] += sumsq
+            
+            self.head = (self.head + 1) % self.BUFFER_SIZE
+            self.size = min(self.size + 1, self.BUFFER_SIZE)
+            self.pending += 1
+            self.version += 1
+            self._evict_expired(cutoff_ns)
+        
+        # Persist to database (batched by the writer thread)
+        self.write_q.put((INSERT_TRANSACTION, (timestamp, status_id, count)))
     
-    def get_recent_data(self, minutes: int) -> pd.DataFrame:
-        """Get recent transaction data"""
-        if not self.recent_data:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(list(self.recent_data))
-        cutoff_time = datetime.now() - timedelta(minutes=minutes)
-        return df[df['timestamp'] >= cutoff_time]
+    @staticmethod
+    def _parse_ts_ns(timestamp: str) -> int:
+        """
+        ISO timestamp to epoch nanoseconds (microsecond precision).
+        Naive timestamps are taken as local time, like datetime.now().
+        Raises TypeError for non-strings, ValueError for non-ISO strings
+        """
+        if not isinstance(timestamp, str):
+            raise TypeError(f"timestamp must be an ISO 8601 string, got {type(timestamp).__name__}")
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return round(dt.timestamp() * 1_000_000) * 1000
+    
+    def get_recent_data(self, minutes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get recent transaction data as (ts_ns, status_id, count) arrays
+        in arrival order
+        """
+        cutoff_ns = time.time_ns() - minutes * 60 * 1_000_000_000
+        with self._lock:
+            # Oldest record sits at head once the buffer has wrapped
+            order = (self.head - self.size + np.arange(self.size)) % self.BUFFER_SIZE
+            ts = self.ts[order]
+            status_id = self.status_id[order]
+            cnt = self.cnt[order]
+        
+        # Client timestamps are not guaranteed to arrive sorted, so mask
+        # rather than searchsorted
+        mask = ts >= cutoff_ns
+        return ts[mask], status_id[mask], cnt[mask]
+    
+    def _evict_one(self):
+        """Drop the record at `tail` from the window totals (lock held)"""
+        i = self.tail
+        if self.counted[i]:
+            sid = self.status_id[i]
+            c = int(self.cnt[i])
+            self.win_n[sid] -= 1
+            self.win_sum[sid] -= c
+            self.win_sumsq[sid] -= float(c) * c
+            self.counted[i] = False
+        self.tail = (i + 1) % self.BUFFER_SIZE
+        self.pending -= 1
+    
+    def _evict_expired(self, cutoff_ns: int):
+        """Advance `tail` past records older than the cutoff (lock held)"""
+        if not self.ordered:
+            self._recount_window(cutoff_ns)
+            return
+        while self.pending and self.ts[self.tail] < cutoff_ns:
+            self._evict_one()
+    
+    def _recount_window(self, cutoff_ns: int):
+        """
+        Rebuild the window totals from the live slots by timestamp mask
+        (lock held). Used while records are out of order, where the first
+        in-window record at `tail` can hide expired ones behind it
+        """
+        live = (self.tail + np.arange(self.pending)) % self.BUFFER_SIZE
+        ts = self.ts[live]
+        inside = ts >= cutoff_ns
+        
+        self.counted[live] = inside
+        sid = self.status_id[live][inside]
+        cnt = self.cnt[live][inside].astype(np.float64)
+        n_statuses = len(STATUSES)
+        self.win_n[:] = np.bincount(sid, minlength=n_statuses)
+        self.win_sum[:] = np.bincount(sid, weights=cnt, minlength=n_statuses)
+        self.win_sumsq[:] = np.bincount(sid, weights=cnt * cnt, minlength=n_statuses)
+        
+        # The expired prefix leaves the live region as usual
+        first = int(inside.argmax()) if inside.any() else self.pending
+        self.tail = (self.tail + first) % self.BUFFER_SIZE
+        self.pending -= first
+        
+        # Back to incremental eviction once what is left is sorted again
+        ts = ts[first:]
+        self.ordered = bool(np.all(ts[1:] >= ts[:-1]))
+    
+    def score_window(self, warn: np.ndarray, crit: np.ndarray,
+                     sigma_warning: float, sigma_critical: float) -> Tuple[np.ndarray, ...]:
+        """
+        Score the running window totals with analyze_kernel.
+        Returns (record counts, sums, sums of squares, rates, z-scores,
+        rule level, statistical level) per status_id
+        """
+        with self._lock:
+            self._evict_expired(time.time_ns() - self.window_ns)
+            n_records = self.win_n.copy()
+            sums = self.win_sum.copy()
+            sums_sq = self.win_sumsq.copy()
+        
+        rates, z_scores, rule_level, stat_level = analyze_kernel(
+            n_records, sums, warn, crit, self.baseline_mean, self.baseline_inv_std,
+            sigma_warning, sigma_critical
+        )
+        return n_records, sums, sums_sq, rates, z_scores, rule_level, stat_level
     
     def save_alert(self, alert_data: dict):
-        """Save alert to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO alerts 
-            (timestamp, alert_type, severity, status, metric_value, threshold_value, anomaly_score, message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        """Save alert to database (batched by the writer thread)"""
+        self.write_q.put((INSERT_ALERT, (
             alert_data['timestamp'],
             alert_data['alert_type'],
             alert_data['severity'],
@@ -221,9 +466,58 @@ class TransactionDataStore:
             alert_data['threshold_value'],
             alert_data['anomaly_score'],
             alert_data['message']
-        ))
-        conn.commit()
-        conn.close()
+        )))
+    
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self.write_q.join()
+    
+    def _writer_loop(self):
+        """Drain the write queue into SQLite, one transaction per batch"""
+        while True:
+            batch = [self.write_q.get()]
+            deadline = time.monotonic() + self.WRITE_BATCH_WAIT
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.write_q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            self._write_batch(batch)
+            for _ in batch:
+                self.write_q.task_done()
+    
+    def _write_batch(self, batch: List[Tuple[str, tuple]]):
+        """Insert a batch of (sql, params) items in a single transaction"""
+        rows_by_sql = {}
+        for sql, params in batch:
+            rows_by_sql.setdefault(sql, []).append(params)
+        
+        try:
+            self.conn.execute("BEGIN")
+            for sql, rows in rows_by_sql.items():
+                self.conn.executemany(sql, rows)
+            self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            logger.warning(f"Batch of {len(batch)} rows failed ({e}); retrying row by row")
+            self._write_rows(batch)
+    
+    def _write_rows(self, batch: List[Tuple[str, tuple]]):
+        """Insert items one at a time (autocommit) so one bad row loses only itself"""
+        failed = 0
+        for sql, params in batch:
+            try:
+                self.conn.execute(sql, params)
+            except sqlite3.Error as e:
+                failed += 1
+                logger.error(f"Failed to persist row {params}: {e}")
+        if failed:
+            logger.error(f"Dropped {failed} of {len(batch)} rows")
 
 # ============================================================================
 # ANOMALY DETECTION ENGINE
@@ -232,22 +526,41 @@ class TransactionDataStore:
 class AnomalyDetector:
     """Hybrid anomaly detection using rule-based and statistical methods"""
     
+    # (severity, score) for the threshold levels reported by analyze_kernel
+    RULE_LEVELS = {1: ('WARNING', 30), 2: ('CRITICAL', 50)}
+    STAT_LEVELS = {1: ('WARNING', 25), 2: ('CRITICAL', 40)}
+    
     def __init__(self, data_store: TransactionDataStore, config: MonitoringConfig):
         self.data_store = data_store
         self.config = config
+        
+        # Rule thresholds indexed by status_id (NaN = no rule for that status)
+        self.warn = np.full(len(STATUSES), np.nan)
+        self.crit = np.full(len(STATUSES), np.nan)
+        for status, warning, critical in (
+            ('failed', config.FAILED_RATE_WARNING, config.FAILED_RATE_CRITICAL),
+            ('denied', config.DENIED_RATE_WARNING, config.DENIED_RATE_CRITICAL),
+            ('reversed', config.REVERSED_RATE_WARNING, config.REVERSED_RATE_CRITICAL),
+            ('backend_reversed', config.BACKEND_REVERSED_RATE_WARNING,
+                                 config.BACKEND_REVERSED_RATE_CRITICAL)
+        ):
+            self.warn[STATUS_TO_ID[status]] = warning
+            self.crit[STATUS_TO_ID[status]] = critical
     
-    def analyze_transaction(self, timestamp: str, status: str, count: int) -> Dict:
+    def analyze_transaction(self, timestamp: str, status_id: int, count: int) -> Dict:
         """
         Analyze a single transaction data point
         Returns alert recommendation with anomaly score
         """
         # Add to data store
-        self.data_store.add_transaction(timestamp, status, count)
+        self.data_store.add_transaction(timestamp, status_id, count)
         
-        # Get recent data for analysis
-        recent_data = self.data_store.get_recent_data(self.config.WINDOW_MEDIUM)
+        # Score the running window totals (WINDOW_MEDIUM, kept by the data store)
+        n_records, sums, sums_sq, rates, _, rule_level, stat_level = self.data_store.score_window(
+            self.warn, self.crit, self.config.SIGMA_WARNING, self.config.SIGMA_CRITICAL
+        )
         
-        if recent_data.empty or len(recent_data) < 5:
+        if n_records.sum() < 5:
             return {
                 'should_alert': False,
                 'alerts': [],
@@ -256,22 +569,24 @@ class AnomalyDetector:
             }
         
         # Calculate current metrics
-        current_metrics = self._calculate_metrics(recent_data)
+        current_metrics = self._summarize(n_records, sums, sums_sq)
         
         # Detect anomalies
         alerts = []
         max_anomaly_score = 0
         
         # Check each problem status type
-        for problem_status in ['failed', 'denied', 'reversed', 'backend_reversed']:
-            if problem_status in current_metrics:
+        for status_id in PROBLEM_STATUS_IDS:
+            if rule_level[status_id] or stat_level[status_id]:
                 alert = self._check_status_anomaly(
-                    problem_status,
-                    current_metrics[problem_status]
+                    status_id,
+                    float(rates[status_id]),
+                    int(sums[status_id]),
+                    int(rule_level[status_id]),
+                    int(stat_level[status_id])
                 )
-                if alert:
-                    alerts.append(alert)
-                    max_anomaly_score = max(max_anomaly_score, alert['anomaly_score'])
+                alerts.append(alert)
+                max_anomaly_score = max(max_anomaly_score, alert['anomaly_score'])
         
         return {
             'should_alert': len(alerts) > 0,
@@ -281,149 +596,87 @@ class AnomalyDetector:
             'timestamp': timestamp
         }
     
-    def _calculate_metrics(self, df: pd.DataFrame) -> Dict:
+    def _calculate_metrics(self, recent_data: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> Dict:
         """Calculate current metrics from recent data"""
+        _, status_id, cnt = recent_data
+        cnt = cnt.astype(np.float64)
+        
+        # Per-status record count, transaction sum and sum of squares in one pass each
+        n_records = np.bincount(status_id, minlength=len(STATUSES))
+        sums = np.bincount(status_id, weights=cnt, minlength=len(STATUSES))
+        sums_sq = np.bincount(status_id, weights=cnt * cnt, minlength=len(STATUSES))
+        
+        return self._summarize(n_records, sums, sums_sq)
+    
+    def _summarize(self, n_records: np.ndarray, sums: np.ndarray, sums_sq: np.ndarray) -> Dict:
+        """Build the metrics dict from per-status record counts, sums and sums of squares"""
         metrics = {}
         
         # Get total transactions
-        total = df['count'].sum()
-        
-        # Calculate metrics for each status
-        for status in df['status'].unique():
-            status_data = df[df['status'] == status]
-            count = status_data['count'].sum()
-            rate = (count / total * 100) if total > 0 else 0
-            
-            metrics[status] = {
+        total = int(sums.sum())
+        
+        # Derived stats for every status present in the window at once
+        present = np.flatnonzero(n_records)
+        n = n_records[present].astype(np.float64)
+        counts = sums[present].astype(np.float64)
+        means = counts / n
+        rates = counts / total * 100 if total > 0 else np.zeros_like(counts)
+        # Sample std (ddof=1), NaN for a single record like pandas
+        variances = np.maximum(sums_sq[present] - counts * means, 0.0) / np.maximum(n - 1, 1)
+        stds = np.where(n > 1, np.sqrt(variances), np.nan)
+        
+        for sid, count, rate, mean, std in zip(
+            present.tolist(), counts.astype(np.int64).tolist(),
+            rates.tolist(), means.tolist(), stds.tolist()
+        ):
+            metrics[STATUSES[sid]] = {
                 'count': count,
                 'rate': rate,
-                'avg_per_minute': status_data['count'].mean(),
-                'std_per_minute': status_data['count'].std()
+                'avg_per_minute': mean,
+                'std_per_minute': std
             }
         
         metrics['total'] = total
         return metrics
     
-    def _check_status_anomaly(self, status: str, metrics: Dict) -> Dict:
-        """Check if a status shows anomalous behavior"""
-        rate = metrics['rate']
-        count = metrics['count']
+    def _check_status_anomaly(self, status_id: int, rate: float, count: int,
+                              rule_level: int, stat_level: int) -> Dict:
+        """Combine rule-based and statistical threshold levels into an alert"""
+        status = STATUSES[status_id]
         
-        # Get baseline if available
-        baseline = self.data_store.baseline.get(status, {})
+        # Calculate combined anomaly score (0-100)
+        anomaly_score = 0
+        severity = 'INFO'
         
-        # Rule-based detection
-        rule_alert = self._rule_based_check(status, rate)
+        if rule_level:
+            severity, score = self.RULE_LEVELS[rule_level]
+            anomaly_score += score
         
-        # Statistical detection
-        stat_alert = self._statistical_check(status, rate, baseline)
+        if stat_level:
+            stat_severity, score = self.STAT_LEVELS[stat_level]
+            anomaly_score += score
+            if stat_severity == 'CRITICAL':
+                severity = 'CRITICAL'
+            elif stat_severity == 'WARNING' and severity != 'CRITICAL':
+                severity = 'WARNING'
         
-        # Combine scores
-        if rule_alert or stat_alert:
-            # Calculate combined anomaly score (0-100)
-            anomaly_score = 0
-            severity = 'INFO'
-            
-            if rule_alert:
-                anomaly_score += rule_alert['score']
-                severity = rule_alert['severity']
-            
-            if stat_alert:
-                anomaly_score += stat_alert['score']
-                if stat_alert['severity'] == 'CRITICAL':
-                    severity = 'CRITICAL'
-                elif stat_alert['severity'] == 'WARNING' and severity != 'CRITICAL':
-                    severity = 'WARNING'
-            
-            anomaly_score = min(100, anomaly_score)
-            
-            return {
-                'status': status,
-                'alert_type': f'{status}_anomaly',
-                'severity': severity,
-                'metric_value': rate,
-                'threshold_value': self._get_threshold(status, severity),
-                'anomaly_score': anomaly_score,
-                'message': f'{status.upper()} transactions at {rate:.2f}% (count: {count})',
-                'timestamp': datetime.now().isoformat()
-            }
+        anomaly_score = min(100, anomaly_score)
         
-        return None
-    
-    def _rule_based_check(self, status: str, rate: float) -> Dict:
-        """Rule-based threshold checking"""
-        thresholds = {
-            'failed': (self.config.FAILED_RATE_WARNING, self.config.FAILED_RATE_CRITICAL),
-            'denied': (self.config.DENIED_RATE_WARNING, self.config.DENIED_RATE_CRITICAL),
-            'reversed': (self.config.REVERSED_RATE_WARNING, self.config.REVERSED_RATE_CRITICAL),
-            'backend_reversed': (self.config.BACKEND_REVERSED_RATE_WARNING, 
-                               self.config.BACKEND_REVERSED_RATE_CRITICAL)
+        return {
+            'status': status,
+            'alert_type': f'{status}_anomaly',
+            'severity': severity,
+            'metric_value': rate,
+            'threshold_value': self._get_threshold(status_id, severity),
+            'anomaly_score': anomaly_score,
+            'message': f'{status.upper()} transactions at {rate:.2f}% (count: {count})',
+            'timestamp': datetime.now().isoformat()
         }
-        
-        if status not in thresholds:
-            return None
-        
-        warning_threshold, critical_threshold = thresholds[status]
-        
-        if rate >= critical_threshold:
-            return {
-                'severity': 'CRITICAL',
-                'score': 50,
-                'threshold': critical_threshold
-            }
-        elif rate >= warning_threshold:
-            return {
-                'severity': 'WARNING',
-                'score': 30,
-                'threshold': warning_threshold
-            }
-        
-        return None
-    
-    def _statistical_check(self, status: str, rate: float, baseline: Dict) -> Dict:
-        """Statistical anomaly detection using Z-score"""
-        if not baseline or 'mean_rate' not in baseline:
-            return None
-        
-        mean = baseline['mean_rate']
-        std = baseline.get('std_rate', 1.0)
-        
-        if std == 0:
-            std = 1.0  # Avoid division by zero
-        
-        # Calculate Z-score
-        z_score = abs((rate - mean) / std)
-        
-        if z_score >= self.config.SIGMA_CRITICAL:
-            return {
-                'severity': 'CRITICAL',
-                'score': 40,
-                'z_score': z_score
-            }
-        elif z_score >= self.config.SIGMA_WARNING:
-            return {
-                'severity': 'WARNING',
-                'score': 25,
-                'z_score': z_score
-            }
-        
-        return None
     
-    def _get_threshold(self, status: str, severity: str) -> float:
+    def _get_threshold(self, status_id: int, severity: str) -> float:
         """Get the threshold value that was breached"""
-        thresholds = {
-            'failed': (self.config.FAILED_RATE_WARNING, self.config.FAILED_RATE_CRITICAL),
-            'denied': (self.config.DENIED_RATE_WARNING, self.config.DENIED_RATE_CRITICAL),
-            'reversed': (self.config.REVERSED_RATE_WARNING, self.config.REVERSED_RATE_CRITICAL),
-            'backend_reversed': (self.config.BACKEND_REVERSED_RATE_WARNING, 
-                               self.config.BACKEND_REVERSED_RATE_CRITICAL)
-        }
-        
-        if status in thresholds:
-            warning, critical = thresholds[status]
-            return critical if severity == 'CRITICAL' else warning
-        
-        return 0.0
+        threshold = self.crit[status_id] if severity == 'CRITICAL' else self.warn[status_id]
+        return 0.0 if np.isnan(threshold) else float(threshold)
 
 # ============================================================================
 # ALERT NOTIFICATION SYSTEM
@@ -478,6 +731,20 @@ config = MonitoringConfig()
 detector = AnomalyDetector(data_store, config)
 alert_system = AlertNotificationSystem(data_store)
 
+# Pre-serialized /api/transaction reply for the no-alert case (timestamp goes between)
+_OK_PREFIX = b'{"should_alert":false,"anomaly_score":0,"alerts":[],"timestamp":'
+_OK_SUFFIX = b',"recommendation":"OK"}'
+
+# /api/metrics bodies (up to the timestamp value) per window:
+# window -> (data_store.version, expiry, prefix)
+METRICS_CACHE_TTL = 1.0  # seconds
+_metrics_cache = {}
+
+def _with_timestamp(prefix: bytes) -> Response:
+    """Complete a cached JSON body prefix with the current timestamp"""
+    body = prefix + orjson.dumps(datetime.now().isoformat()) + b'}'
+    return Response(body, mimetype='application/json')
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
@@ -503,38 +770,66 @@ def receive_transaction():
     }
     """
     try:
-        data = request.json
-        
-        # Validate input
-        required_fields = ['timestamp', 'status', 'count']
-        if not all(field in data for field in required_fields):
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+            timestamp, status, count = data['timestamp'], data['status'], data['count']
+        except (orjson.JSONDecodeError, KeyError, TypeError):
             return jsonify({
                 'error': 'Missing required fields',
-                'required': required_fields
+                'required': ['timestamp', 'status', 'count']
+            }), 400
+        
+        # Timestamps are ISO 8601 strings no later than the allowed clock skew
+        try:
+            ts_ns = TransactionDataStore._parse_ts_ns(timestamp)
+        except (TypeError, ValueError):
+            ts_ns = None
+        if ts_ns is None or ts_ns > time.time_ns() + TransactionDataStore.MAX_CLOCK_SKEW_NS:
+            return jsonify({
+                'error': 'Invalid timestamp',
+                'allowed': 'ISO 8601 string, e.g. "2025-07-12 13:45:00", not in the future'
+            }), 400
+        
+        # cnt is int32: a JSON number with a whole value in range (5 or 5.0;
+        # not "5", true or 5.5)
+        if isinstance(count, float) and count.is_integer():
+            count = int(count)
+        if type(count) is not int or not 0 <= count <= TransactionDataStore.MAX_COUNT:
+            return jsonify({
+                'error': 'Invalid count',
+                'allowed': f'whole number from 0 to {TransactionDataStore.MAX_COUNT}'
+            }), 400
+        
+        # Statuses travel as ids from here on; names return only in the response
+        status_id = STATUS_TO_ID.get(status)
+        if status_id is None:
+            return jsonify({
+                'error': 'Unknown status',
+                'allowed': STATUSES
             }), 400
         
         # Analyze transaction
-        result = detector.analyze_transaction(
-            data['timestamp'],
-            data['status'],
-            data['count']
-        )
+        result = detector.analyze_transaction(timestamp, status_id, count)
         
-        # Send alerts if needed
-        if result['should_alert']:
-            for alert in result['alerts']:
-                alert_system.send_alert(alert)
+        # Common case: nothing to report, only the timestamp varies
+        if not result['should_alert']:
+            body = _OK_PREFIX + orjson.dumps(timestamp) + _OK_SUFFIX
+            return Response(body, mimetype='application/json')
+        
+        # Send alerts
+        for alert in result['alerts']:
+            alert_system.send_alert(alert)
         
         # Return recommendation
         response = {
-            'should_alert': result['should_alert'],
+            'should_alert': True,
             'anomaly_score': result['anomaly_score'],
             'alerts': result['alerts'],
-            'timestamp': result['timestamp'],
-            'recommendation': 'ALERT' if result['should_alert'] else 'OK'
+            'timestamp': timestamp,
+            'recommendation': 'ALERT'
         }
         
-        return jsonify(response), 200
+        return Response(orjson.dumps(response), mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Error processing transaction: {e}")
@@ -547,9 +842,15 @@ def get_current_metrics():
     """Get current transaction metrics"""
     try:
         window = int(request.args.get('window', 15))  # minutes
+        
+        cached = _metrics_cache.get(window)
+        if cached and cached[0] == data_store.version and time.monotonic() < cached[1]:
+            return _with_timestamp(cached[2])
+        
+        version = data_store.version
         recent_data = data_store.get_recent_data(window)
         
-        if recent_data.empty:
+        if len(recent_data[0]) == 0:
             return jsonify({
                 'metrics': {},
                 'message': 'No recent data available'
@@ -557,11 +858,15 @@ def get_current_metrics():
         
         metrics = detector._calculate_metrics(recent_data)
         
-        return jsonify({
+        prefix = orjson.dumps({
             'window_minutes': window,
-            'metrics': metrics,
-            'timestamp': datetime.now().isoformat()
-        })
+            'metrics': metrics
+        })[:-1] + b',"timestamp":'
+        if len(_metrics_cache) >= 64:  # arbitrary windows from clients; keep it bounded
+            _metrics_cache.clear()
+        _metrics_cache[window] = (version, time.monotonic() + METRICS_CACHE_TTL, prefix)
+        
+        return _with_timestamp(prefix)
         
     except Exception as e:
         logger.error(f"Error getting metrics: {e}")
@@ -587,12 +892,9 @@ def get_alerts():
 @app.route('/api/baseline', methods=['GET'])
 def get_baseline():
     """Get baseline statistics"""
-    return jsonify({
-        'baseline': data_store.baseline,
-        'timestamp': datetime.now().isoformat()
-    })
+    return _with_timestamp(data_store.baseline_json_prefix)
 
 if __name__ == '__main__':
     logger.info("Starting Transaction Monitoring API...")
     logger.info(f"Configuration: {config.__dict__}")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,8 @@
+"""
+WSGI Entry Point for the Transaction Monitoring API
+Run with: gunicorn -k gthread -w 1 --threads 8 -b 0.0.0.0:5000 wsgi:app
+"""
+
+# The ring buffer, baseline and SQLite writer thread live in this process,
+# so the API is served by one worker and scaled with threads, not workers
+from transaction_monitor import app